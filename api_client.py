@@ -1,19 +1,41 @@
 """FAL.ai API client with rate limiting and retry logic."""
 
+import asyncio
+import hashlib
+import json
+import os
+import random
 import time
+import diskcache
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import AsyncIterator, Dict, Optional
 import fal_client
 from config import (
     FAL_API_ENDPOINT,
     FAL_API_KEY,
-    THROTTLE_DELAY,
+    MAX_CONCURRENCY,
+    MAX_REQUESTS_PER_SECOND,
+    MIN_REQUESTS_PER_SECOND,
+    RATE_INCREASE_STEP,
+    RATE_DECREASE_FACTOR,
     MAX_RETRIES,
     INITIAL_RETRY_DELAY,
     MAX_RETRY_DELAY,
     RETRY_BACKOFF_MULTIPLIER,
     TIMEOUT,
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_RETRY_TOTAL,
+    HTTP_RETRY_BACKOFF_FACTOR,
+    HTTP_RETRY_STATUS_CODES,
+    DOWNLOAD_CHUNK_SIZE,
+    FAL_CACHE_DIR,
+    CACHE_TTL,
     DEFAULT_GUIDANCE_SCALE,
     DEFAULT_NUM_INFERENCE_STEPS,
     DEFAULT_ACCELERATION,
@@ -31,15 +53,221 @@ class RateLimitError(Exception):
     pass
 
 
+def create_http_session() -> requests.Session:
+    """
+    Create a requests session with a keep-alive connection pool and retries.
+
+    Returns:
+        Session whose HTTPS connections are pooled and reused across downloads
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=Retry(
+            total=HTTP_RETRY_TOTAL,
+            backoff_factor=HTTP_RETRY_BACKOFF_FACTOR,
+            status_forcelist=HTTP_RETRY_STATUS_CODES,
+        ),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _request_cache_key(arguments: Dict) -> str:
+    """
+    Build a stable cache key for an API request.
+
+    Args:
+        arguments: Arguments sent to the FAL.ai endpoint
+
+    Returns:
+        Hex digest identifying the endpoint and arguments
+    """
+    payload = json.dumps(
+        {"endpoint": FAL_API_ENDPOINT, "arguments": arguments},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _has_image_url(result: Dict) -> bool:
+    """
+    Check that an API response carries a generated image URL.
+
+    Args:
+        result: API response dictionary
+
+    Returns:
+        True if result["images"][0]["url"] is present
+    """
+    try:
+        return bool(result["images"][0]["url"])
+    except (KeyError, IndexError, TypeError):
+        return False
+
+
+async def _cancel_request(request_id: str):
+    """
+    Best-effort cancellation of a queued or running FAL.ai request.
+
+    Args:
+        request_id: ID reported by fal_client when the request was enqueued
+    """
+    try:
+        await fal_client.cancel_async(FAL_API_ENDPOINT, request_id)
+    except Exception:
+        pass
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    """
+    Check whether an API error is a rate limit (HTTP 429) response.
+
+    Args:
+        error: Exception raised by the API client
+
+    Returns:
+        True if the error indicates rate limiting
+    """
+    # FalClientHTTPError's message is only the response detail, so check the
+    # status code before falling back to the message text
+    if getattr(error, "status_code", None) == 429:
+        return True
+    error_str = str(error)
+    return "429" in error_str or "rate limit" in error_str.lower()
+
+
+def _parse_retry_after(error: Exception) -> Optional[float]:
+    """
+    Extract a Retry-After delay from an HTTP error raised by the API client.
+
+    Args:
+        error: Exception that may carry response headers
+
+    Returns:
+        Delay in seconds, or None if the header is absent or unparseable
+    """
+    headers = getattr(error, "response_headers", None)
+    if headers is None:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+
+    value = next(
+        (v for k, v in headers.items() if k.lower() == "retry-after"),
+        None,
+    )
+    if value is None:
+        return None
+
+    # Retry-After is either delta-seconds or an HTTP-date
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """Proactive request rate limiter with AIMD refill-rate adjustment."""
+
+    def __init__(
+        self,
+        max_rate: float = MAX_REQUESTS_PER_SECOND,
+        min_rate: float = MIN_REQUESTS_PER_SECOND,
+    ):
+        """
+        Initialize the token bucket.
+
+        Args:
+            max_rate: Highest refill rate in requests per second
+            min_rate: Lowest refill rate the bucket backs off to
+        """
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.rate = max_rate
+        self.capacity = max(1.0, max_rate)
+        self.available_request_capacity = self.capacity
+        self.last_update = time.monotonic()
+        # 429s before this time belong to the same congestion event
+        self._decrease_until = 0.0
+
+    def _refill(self):
+        """Credit capacity accrued since the last update at the current rate."""
+        now = time.monotonic()
+        if now > self.last_update:
+            self.available_request_capacity = min(
+                self.capacity,
+                self.available_request_capacity + (now - self.last_update) * self.rate,
+            )
+            self.last_update = now
+
+    async def acquire(self):
+        """Wait until one request's worth of capacity is available and consume it."""
+        while True:
+            self._refill()
+            if self.available_request_capacity >= 1:
+                self.available_request_capacity -= 1
+                return
+            # Sleep until the bucket is expected to hold a full token again
+            wait = max(
+                self.last_update - time.monotonic(),
+                (1 - self.available_request_capacity) / self.rate,
+            )
+            await asyncio.sleep(wait)
+
+    def record_success(self):
+        """Additively raise the refill rate after a successful call."""
+        self.rate = min(self.max_rate, self.rate + RATE_INCREASE_STEP)
+
+    def record_rate_limit(self, retry_after: Optional[float] = None):
+        """
+        Multiplicatively lower the refill rate after a 429 and drain the bucket.
+
+        Concurrent calls rejected by the same burst report their 429s together,
+        so the rate is lowered at most once per congestion event: further 429s
+        are ignored until one interval at the new rate (or the server's pause,
+        if longer) has passed.
+
+        Args:
+            retry_after: Server-requested pause in seconds, if provided
+        """
+        self._refill()
+        now = time.monotonic()
+        if now >= self._decrease_until:
+            self.rate = max(self.min_rate, self.rate * RATE_DECREASE_FACTOR)
+            self._decrease_until = now + 1 / self.rate
+        self.available_request_capacity = 0.0
+        if retry_after:
+            # Refilling starts again only once the server's pause has elapsed
+            self.last_update = max(self.last_update, now + retry_after)
+        self._decrease_until = max(self._decrease_until, self.last_update)
+
+
 class APIClient:
     """Client for interacting with FAL.ai API with rate limiting."""
 
-    def __init__(self, api_key: str = FAL_API_KEY):
+    def __init__(
+        self,
+        api_key: str = FAL_API_KEY,
+        session: Optional[requests.Session] = None,
+        cache: Optional[diskcache.Cache] = None,
+    ):
         """
         Initialize the API client.
 
         Args:
             api_key: FAL.ai API key. Uses FAL_KEY environment variable if not provided.
+            session: Shared HTTP session for downloads. A pooled one is created if not provided.
+            cache: Disk cache for API responses. Opened at FAL_CACHE_DIR if not provided.
         """
         if not api_key:
             raise ValueError(
@@ -49,6 +277,9 @@ class APIClient:
 
         self.api_key = api_key
         fal_client.api_key = api_key
+        self.session = session or create_http_session()
+        self.cache = cache if cache is not None else diskcache.Cache(str(FAL_CACHE_DIR))
+        self._rate_limiter = TokenBucket()
         self._log("API client initialized")
 
     def _log(self, message: str):
@@ -56,11 +287,7 @@ class APIClient:
         if VERBOSE:
             print(f"[API] {message}")
 
-    def _apply_throttle(self):
-        """Apply throttle delay between API calls."""
-        time.sleep(THROTTLE_DELAY)
-
-    def generate_multi_angle_views(
+    async def stream_views(
         self,
         image_url: str,
         guidance_scale: float = DEFAULT_GUIDANCE_SCALE,
@@ -70,9 +297,15 @@ class APIClient:
         vertical_angle: float = 0,
         wide_angle_lens: bool = False,
         output_format: str = DEFAULT_OUTPUT_FORMAT,
-    ) -> List[Dict]:
+    ) -> AsyncIterator[Dict]:
         """
-        Generate multi-angle views of an image by rotating the camera.
+        Generate multi-angle views, yielding each one as soon as it completes.
+
+        All angles are scheduled concurrently; at most MAX_CONCURRENCY calls are
+        in flight at once and call starts are paced by a token bucket. Views are
+        yielded in completion order, so callers can start downloading before
+        the last angle finishes. If any view fails, the error is raised once
+        every other view has completed.
 
         Args:
             image_url: URL of the image to process
@@ -84,83 +317,121 @@ class APIClient:
             wide_angle_lens: Enable wide-angle lens effect
             output_format: Output image format (png, jpeg, webp)
 
-        Returns:
-            List of generated image URLs
+        Yields:
+            Dicts with 'angle', 'url' and 'seed' keys
         """
-        results = []
         # Skip 0 degrees since we already have the original image
-        angles = [angle for angle in range(ROTATION_INCREMENT, FULL_ROTATION + ROTATION_INCREMENT, ROTATION_INCREMENT)]
+        angles = range(ROTATION_INCREMENT, FULL_ROTATION + ROTATION_INCREMENT, ROTATION_INCREMENT)
         total_images = len(angles)
 
         self._log(f"Starting generation of {total_images} multi-angle views")
         self._log(f"Rotation increment: {ROTATION_INCREMENT}° (skipping 0° - using original)")
 
-        for i, angle in enumerate(angles, 1):
-            # Rotate left (positive) for positive angles
-            rotate_right_left = angle
-
-            self._log(f"Generating view {i}/{total_images} at rotation {angle}°")
-
-            try:
-                # Apply throttle delay before API call
-                self._apply_throttle()
-
-                # Call API with retry logic
-                result = self._call_api_with_retry(
-                    image_url=image_url,
-                    rotate_right_left=rotate_right_left,
-                    guidance_scale=guidance_scale,
-                    num_inference_steps=num_inference_steps,
-                    lora_scale=lora_scale,
-                    move_forward=move_forward,
-                    vertical_angle=vertical_angle,
-                    wide_angle_lens=wide_angle_lens,
-                    output_format=output_format,
+        # Every argument except the rotation is shared by all calls
+        base_arguments = {
+            "image_urls": [image_url],
+            "guidance_scale": guidance_scale,
+            "num_inference_steps": num_inference_steps,
+            "acceleration": DEFAULT_ACCELERATION,
+            "negative_prompt": DEFAULT_NEGATIVE_PROMPT,
+            "enable_safety_checker": True,
+            "output_format": output_format,
+            "num_images": 1,
+            "move_forward": move_forward,
+            "vertical_angle": vertical_angle,
+            "wide_angle_lens": wide_angle_lens,
+            "lora_scale": lora_scale,
+        }
+
+        # Created here so it binds to the running event loop
+        semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+        tasks = [
+            asyncio.create_task(
+                self._generate_view_async(
+                    semaphore=semaphore,
+                    index=i,
+                    total_images=total_images,
+                    # Rotate left (positive) for positive angles
+                    arguments={**base_arguments, "rotate_right_left": angle},
                 )
+            )
+            for i, angle in enumerate(angles)
+        ]
 
-                results.append({
-                    "angle": angle,
-                    "url": result["images"][0]["url"],
-                    "seed": result.get("seed"),
-                })
-
-                self._log(f"✓ Successfully generated view at {angle}°")
-
-            except RateLimitError as e:
-                self._log(f"✗ Rate limit exceeded at {angle}°: {e}")
-                raise
-            except Exception as e:
-                self._log(f"✗ Failed to generate view at {angle}°: {e}")
-                raise
+        errors = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    result = await next_done
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                yield result
+        finally:
+            # Stop outstanding calls if the consumer bails out early, and wait
+            # for them so their queued FAL jobs are cancelled too
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if errors:
+            self._log(f"✗ {len(errors)}/{total_images} views failed")
+            # Surface rate limiting first so callers can react to it specifically
+            for error in errors:
+                if isinstance(error, RateLimitError):
+                    raise error
+            raise errors[0]
 
         self._log(f"✓ Successfully generated all {total_images} views")
-        return results
 
-    def _call_api_with_retry(
+    async def _generate_view_async(
         self,
-        image_url: str,
-        rotate_right_left: float,
-        guidance_scale: float,
-        num_inference_steps: int,
-        lora_scale: float,
-        move_forward: float,
-        vertical_angle: float,
-        wide_angle_lens: bool,
-        output_format: str,
+        semaphore: asyncio.Semaphore,
+        index: int,
+        total_images: int,
+        arguments: Dict,
     ) -> Dict:
+        """
+        Generate a single view and shape the API response into a result dict.
+
+        Args:
+            semaphore: Semaphore bounding the number of in-flight calls
+            index: Zero-based position of this view in the batch
+            total_images: Number of views in the batch
+            arguments: Arguments for the FAL.ai endpoint, including rotate_right_left
+
+        Returns:
+            Dict with 'angle', 'url' and 'seed' keys
+        """
+        angle = arguments["rotate_right_left"]
+
+        try:
+            async with semaphore:
+                self._log(f"Generating view {index + 1}/{total_images} at rotation {angle}°")
+                result = await self._call_api_async(arguments)
+        except RateLimitError as e:
+            self._log(f"✗ Rate limit exceeded at {angle}°: {e}")
+            raise
+        except Exception as e:
+            self._log(f"✗ Failed to generate view at {angle}°: {e}")
+            raise
+
+        self._log(f"✓ Successfully generated view at {angle}°")
+        return {
+            "angle": angle,
+            "url": result["images"][0]["url"],
+            "seed": result.get("seed"),
+        }
+
+    async def _call_api_async(self, arguments: Dict) -> Dict:
         """
         Call the FAL.ai API with exponential backoff retry logic.
 
+        Successful responses are cached on disk keyed by the request arguments,
+        so reruns and resumed batches skip calls that already succeeded.
+
         Args:
-            image_url: URL of the image
-            rotate_right_left: Rotation angle
-            guidance_scale: CFG scale
-            num_inference_steps: Number of inference steps
-            lora_scale: LoRA scale
-            move_forward: Camera zoom
-            vertical_angle: Vertical camera angle
-            wide_angle_lens: Enable wide-angle lens
-            output_format: Output format
+            arguments: Arguments for the FAL.ai endpoint
 
         Returns:
             API response dictionary
@@ -168,53 +439,75 @@ class APIClient:
         Raises:
             RateLimitError: If rate limit is exceeded after all retries
         """
+        rotate_right_left = arguments["rotate_right_left"]
+
+        cache_key = _request_cache_key(arguments)
+        cached = self.cache.get(cache_key)
+        if cached is not None and _has_image_url(cached):
+            self._log(f"Cache HIT for rotation {rotate_right_left}°")
+            return cached
+
         retry_delay = INITIAL_RETRY_DELAY
         last_error = None
 
         for attempt in range(1, MAX_RETRIES + 1):
+            # Jitter spreads concurrent retries across the window instead of
+            # having every task retry at the same instant
+            sleep_for = min(random.uniform(retry_delay, retry_delay * 2), MAX_RETRY_DELAY)
+
+            await self._rate_limiter.acquire()
+            request_ids = []
             try:
-                result = fal_client.subscribe(
+                # client_timeout cancels the queued FAL job on timeout, so a retry
+                # never leaves a duplicate billed generation running
+                result = await fal_client.subscribe_async(
                     FAL_API_ENDPOINT,
-                    arguments={
-                        "image_urls": [image_url],
-                        "guidance_scale": guidance_scale,
-                        "num_inference_steps": num_inference_steps,
-                        "acceleration": DEFAULT_ACCELERATION,
-                        "negative_prompt": DEFAULT_NEGATIVE_PROMPT,
-                        "enable_safety_checker": True,
-                        "output_format": output_format,
-                        "num_images": 1,
-                        "rotate_right_left": rotate_right_left,
-                        "move_forward": move_forward,
-                        "vertical_angle": vertical_angle,
-                        "wide_angle_lens": wide_angle_lens,
-                        "lora_scale": lora_scale,
-                    },
+                    arguments=arguments,
+                    client_timeout=TIMEOUT,
+                    on_enqueue=request_ids.append,
                 )
+                self._rate_limiter.record_success()
+                # Only cache responses that can be used, so a malformed one is
+                # retried instead of being replayed on every rerun
+                if not _has_image_url(result):
+                    raise ValueError(f"API response contained no image URL: {result}")
+                self.cache.set(cache_key, result, expire=CACHE_TTL)
                 return result
 
-            except requests.exceptions.Timeout:
+            except asyncio.CancelledError:
+                # Cancelling this task does not stop the job on FAL's queue
+                if request_ids:
+                    await _cancel_request(request_ids[-1])
+                raise
+
+            except TimeoutError:
                 last_error = "Request timeout"
-                self._log(f"Attempt {attempt}/{MAX_RETRIES}: Timeout - retrying in {retry_delay}s")
+                self._log(f"Attempt {attempt}/{MAX_RETRIES}: Timeout - retrying in {sleep_for:.1f}s")
 
             except Exception as e:
                 error_str = str(e)
 
                 # Check for rate limit error (429)
-                if "429" in error_str or "rate limit" in error_str.lower():
+                if _is_rate_limit_error(e):
+                    retry_after = _parse_retry_after(e)
+                    self._rate_limiter.record_rate_limit(retry_after)
                     if attempt == MAX_RETRIES:
                         raise RateLimitError(
                             f"Rate limit exceeded after {MAX_RETRIES} retries: {error_str}"
                         )
+                    # Honor the server's requested wait when it gives one; a
+                    # longer pause is still enforced by the token bucket
+                    if retry_after is not None:
+                        sleep_for = min(retry_after, MAX_RETRY_DELAY)
                     last_error = f"Rate limit: {error_str}"
-                    self._log(f"Attempt {attempt}/{MAX_RETRIES}: Rate limited - retrying in {retry_delay}s")
+                    self._log(f"Attempt {attempt}/{MAX_RETRIES}: Rate limited - retrying in {sleep_for:.1f}s")
                 else:
                     last_error = str(e)
                     self._log(f"Attempt {attempt}/{MAX_RETRIES}: {error_str}")
 
             # Don't sleep after the last failed attempt
             if attempt < MAX_RETRIES:
-                time.sleep(retry_delay)
+                await asyncio.sleep(sleep_for)
                 # Exponential backoff with cap
                 retry_delay = min(retry_delay * RETRY_BACKOFF_MULTIPLIER, MAX_RETRY_DELAY)
 
@@ -232,17 +525,25 @@ class APIClient:
         Returns:
             True if successful, False otherwise
         """
+        # Stream into a sibling temp file so a failed download never leaves a
+        # truncated image at output_path
+        part_path = output_path.with_suffix(output_path.suffix + ".part")
+
         try:
-            response = requests.get(image_url, timeout=TIMEOUT)
-            response.raise_for_status()
+            with self.session.get(image_url, timeout=TIMEOUT, stream=True) as response:
+                response.raise_for_status()
 
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(output_path, "wb") as f:
-                f.write(response.content)
+                # Stream to disk instead of buffering the whole body in memory
+                output_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(part_path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
 
+            os.replace(part_path, output_path)
             self._log(f"Downloaded image to {output_path}")
             return True
 
         except Exception as e:
+            part_path.unlink(missing_ok=True)
             self._log(f"Failed to download image from {image_url}: {e}")
             return False
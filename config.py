@@ -30,19 +30,37 @@ DEFAULT_VERTICAL_ANGLE = 0  # -1 to 1, 0 = neutral
 DEFAULT_WIDE_ANGLE_LENS = False
 
 # Rate Limiting and Retry Configuration
-THROTTLE_DELAY = 1.5  # seconds between API calls
+MAX_CONCURRENCY = 8  # maximum in-flight API calls
+MAX_REQUESTS_PER_SECOND = 1.0  # token bucket refill rate ceiling
+MIN_REQUESTS_PER_SECOND = 0.1  # refill rate floor after repeated 429s
+RATE_INCREASE_STEP = 0.05  # requests/second added back after each success
+RATE_DECREASE_FACTOR = 0.5  # refill rate multiplier applied on a 429
 MAX_RETRIES = 5
 INITIAL_RETRY_DELAY = 2  # seconds
 MAX_RETRY_DELAY = 60  # seconds
 RETRY_BACKOFF_MULTIPLIER = 2
 TIMEOUT = 300  # seconds
 
+# HTTP Connection Pooling (image downloads)
+HTTP_POOL_CONNECTIONS = 16  # number of host pools to cache
+HTTP_POOL_MAXSIZE = 32  # keep-alive connections per host
+HTTP_RETRY_TOTAL = 3
+HTTP_RETRY_BACKOFF_FACTOR = 0.5
+HTTP_RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+DOWNLOAD_WORKERS = 16  # parallel image downloads
+DOWNLOAD_CHUNK_SIZE = 64 * 1024  # bytes streamed to disk per write
+
 # Supported Image Formats
 SUPPORTED_FORMATS = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif"}
 
 # Output Directory
 OUTPUT_BASE_DIR = Path("generated_views")
 OUTPUT_BASE_DIR.mkdir(exist_ok=True)
+MONTAGE_FORMAT = "png"  # "png" (lossless) or "webp" (smaller, faster lossy preview)
+
+# Response Cache (API results and downloaded images)
+FAL_CACHE_DIR = Path(".fal_cache")
+CACHE_TTL = 7 * 24 * 60 * 60  # seconds (7 days)
 
 # Logging
 VERBOSE = True
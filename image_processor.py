@@ -1,21 +1,122 @@
 """Image processing and validation utilities."""
 
 import os
-import base64
+import mimetypes
+import mmap
+import shutil
 from pathlib import Path
 from typing import Optional
+import numpy as np
 from PIL import Image
+import diskcache
+import fal_client
 import requests
-from config import SUPPORTED_FORMATS, OUTPUT_BASE_DIR, VERBOSE
+from api_client import create_http_session
+from config import (
+    SUPPORTED_FORMATS,
+    OUTPUT_BASE_DIR,
+    DOWNLOAD_CHUNK_SIZE,
+    FAL_CACHE_DIR,
+    CACHE_TTL,
+    VERBOSE,
+)
+
+try:
+    # SIMD-accelerated, API-compatible replacement for the stdlib module
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+try:
+    # SIMD tree hash, noticeably cheaper than sha256 on large files
+    from blake3 import blake3 as _file_hash
+except ImportError:
+    from hashlib import sha256 as _file_hash
+
+
+def _read_file(path: Path) -> bytearray:
+    """
+    Read a file into a buffer preallocated to its exact size.
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        Buffer holding the file contents
+    """
+    size = path.stat().st_size
+    buf = bytearray(size)
+    read = 0
+    with open(path, "rb", buffering=0) as f, memoryview(buf) as view:
+        while read < size:
+            n = f.readinto(view[read:])
+            if not n:
+                break
+            read += n
+    # The file shrank between stat() and read; drop the unfilled tail
+    del buf[read:]
+    return buf
+
+
+def _file_digest(path: Path) -> str:
+    """
+    Hash a file's contents without copying it into Python memory.
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        Hex digest of the file contents
+    """
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _file_hash(mm).hexdigest()
+
+
+# MIME types for the supported input formats, used when building data URIs
+_MIME_BY_SUFFIX = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+    ".bmp": "image/bmp",
+    ".gif": "image/gif",
+}
 
 
 class ImageProcessor:
     """Handle image validation and processing."""
 
-    def __init__(self):
-        """Initialize the image processor."""
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        cache: Optional[diskcache.Cache] = None,
+    ):
+        """
+        Initialize the image processor.
+
+        Args:
+            session: Shared HTTP session for downloads. Created lazily if not provided.
+            cache: Disk cache for downloaded images. Opened lazily if not provided.
+        """
+        self._session = session
+        self._cache = cache
         self._log("Image processor initialized")
 
+    @property
+    def session(self) -> requests.Session:
+        """HTTP session used for downloads, with keep-alive connection pooling."""
+        if self._session is None:
+            self._session = create_http_session()
+        return self._session
+
+    @property
+    def cache(self) -> diskcache.Cache:
+        """Disk cache of uploaded image URLs and downloaded image bytes."""
+        if self._cache is None:
+            self._cache = diskcache.Cache(str(FAL_CACHE_DIR))
+        return self._cache
+
     def _log(self, message: str):
         """Log message if verbose mode is enabled."""
         if VERBOSE:
@@ -50,15 +151,57 @@ class ImageProcessor:
                 f"Unsupported image format: {file_ext}. Supported formats: {supported}"
             )
 
-        # Try to open the image to ensure it's valid
+        # Check the image structure without decoding any pixel data
         try:
             with Image.open(path) as img:
-                self._log(f"✓ Image validated: {path.name} ({img.width}x{img.height})")
-                return path
+                # Dimensions come from the header parsed by open()
+                width, height = img.size
+                img.verify()
         except Exception as e:
             raise ValueError(f"Invalid image file: {e}")
 
+        self._log(f"✓ Image validated: {path.name} ({width}x{height})")
+        return path
+
     def upload_image_to_fal(self, image_path: Path) -> str:
+        """
+        Upload a local image to FAL.ai storage and return its URL.
+
+        The image is uploaded once and every API call references the short
+        URL. Uploads are cached by content hash, so rerunning on the same
+        image reuses the earlier URL. If the upload fails, falls back to an
+        inline base64 data URI.
+
+        Args:
+            image_path: Path to the local image
+
+        Returns:
+            URL of the uploaded image (or a base64 data URI fallback)
+
+        Raises:
+            IOError: If unable to upload or encode the image
+        """
+        try:
+            cache_key = ("upload", _file_digest(image_path))
+        except (OSError, ValueError) as e:
+            raise IOError(f"Failed to read image for upload: {e}")
+
+        image_url = self.cache.get(cache_key)
+        if image_url is not None:
+            self._log(f"Reusing earlier upload of identical image: {image_url}")
+            return image_url
+
+        try:
+            image_url = fal_client.upload_file(str(image_path))
+            self.cache.set(cache_key, image_url, expire=CACHE_TTL)
+            self._log(f"Image uploaded to FAL.ai storage: {image_url}")
+            return image_url
+        except Exception as e:
+            self._log(f"Upload to FAL.ai storage failed ({e}) - using base64 data URI")
+
+        return self._encode_data_uri(image_path)
+
+    def _encode_data_uri(self, image_path: Path) -> str:
         """
         Convert a local image to base64 data URI for FAL.ai API.
 
@@ -74,27 +217,30 @@ class ImageProcessor:
             IOError: If unable to read or encode the image
         """
         try:
-            # Read the image file
-            with open(image_path, "rb") as f:
-                image_data = f.read()
+            # Read the image file in a single exact-size allocation
+            image_data = _read_file(image_path)
 
             self._log(f"Read image file: {len(image_data)} bytes")
 
             # Determine the image format for the data URI
             suffix = image_path.suffix.lower()
-            mime_types = {
-                ".jpg": "image/jpeg",
-                ".jpeg": "image/jpeg",
-                ".png": "image/png",
-                ".webp": "image/webp",
-                ".bmp": "image/bmp",
-                ".gif": "image/gif",
-            }
-            mime_type = mime_types.get(suffix, "image/jpeg")
-
-            # Convert to base64 data URI
-            b64_data = base64.b64encode(image_data).decode("utf-8")
-            data_uri = f"data:{mime_type};base64,{b64_data}"
+            mime_type = (
+                _MIME_BY_SUFFIX.get(suffix)
+                or mimetypes.guess_type(image_path.name)[0]
+                or "image/jpeg"
+            )
+
+            # Convert to base64 data URI. Each intermediate is dropped as soon as
+            # the next one exists, so at most two copies of the payload are alive
+            b64 = base64.b64encode(image_data)
+            del image_data
+            buf = bytearray(b"data:")
+            buf += mime_type.encode("ascii")
+            buf += b";base64,"
+            buf += b64
+            del b64
+            data_uri = buf.decode("ascii")
+            del buf
 
             self._log(f"Image converted to base64 data URI ({len(data_uri)} chars)")
             return data_uri
@@ -117,49 +263,60 @@ class ImageProcessor:
         self._log(f"Output directory: {output_dir}")
         return output_dir
 
-    def save_generated_images(
-        self,
-        results: list,
-        output_dir: Path,
-        image_format: str = "png",
-    ) -> list:
+    def save_generated_image(self, result: dict, output_dir: Path, image_format: str = "png") -> Optional[Path]:
         """
-        Download and save generated images with angle-based naming.
+        Download a single generated image and save it with angle-based naming.
 
         Args:
-            results: List of dicts with 'angle' and 'url' keys
-            output_dir: Directory to save images
+            result: Dict with 'angle' and 'url' keys
+            output_dir: Directory to save the image
             image_format: Image format (png, jpeg, webp)
 
         Returns:
-            List of saved file paths
+            Path of the saved file, or None if the download failed
         """
-        saved_files = []
+        angle = result["angle"]
+        url = result["url"]
 
-        for result in results:
-            angle = result["angle"]
-            url = result["url"]
+        # Create filename with angle
+        filename = f"view_{angle:03d}deg.{image_format}"
+        output_path = output_dir / filename
 
-            # Create filename with angle
-            filename = f"view_{angle:03d}deg.{image_format}"
-            output_path = output_dir / filename
+        # Write into a sibling temp file so a failed download never leaves a
+        # truncated frame in the output directory
+        part_path = output_path.with_suffix(output_path.suffix + ".part")
+        cache_key = ("image", url)
 
-            try:
-                # Download the image
-                response = requests.get(url, timeout=30)
+        try:
+            cached = self.cache.get(cache_key, read=True)
+            if cached is not None:
+                with cached, open(part_path, "wb") as f:
+                    shutil.copyfileobj(cached, f, DOWNLOAD_CHUNK_SIZE)
+                os.replace(part_path, output_path)
+                self._log(f"✓ Saved from cache: {filename}")
+                return output_path
+
+            # Download the image
+            with self.session.get(url, timeout=30, stream=True) as response:
                 response.raise_for_status()
 
-                # Save to file
-                with open(output_path, "wb") as f:
-                    f.write(response.content)
+                # Stream to file instead of buffering the whole body in memory
+                with open(part_path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
 
-                saved_files.append(output_path)
-                self._log(f"✓ Saved: {filename}")
+            os.replace(part_path, output_path)
 
-            except Exception as e:
-                self._log(f"✗ Failed to save {filename}: {e}")
+            with open(output_path, "rb") as f:
+                self.cache.set(cache_key, f, read=True, expire=CACHE_TTL)
 
-        return saved_files
+            self._log(f"✓ Saved: {filename}")
+            return output_path
+
+        except Exception as e:
+            part_path.unlink(missing_ok=True)
+            self._log(f"✗ Failed to save {filename}: {e}")
+            return None
 
     def get_image_info(self, image_path: Path) -> dict:
         """
@@ -184,14 +341,26 @@ class ImageProcessor:
             self._log(f"Error getting image info: {e}")
             return {}
 
-    def create_montage(self, image_paths: list, output_path: Path, cols: int = 12) -> bool:
+    def create_montage(
+        self,
+        image_paths: list,
+        output_path: Path,
+        cols: int = 12,
+        thumb_size: tuple = (256, 256),
+    ) -> bool:
         """
         Create a montage of generated images for quick preview.
 
+        Each frame is downscaled to fit within thumb_size before tiling, so the
+        preview stays small regardless of the generated image resolution.
+        PNG montages are written at compression level 1; a .webp output_path
+        is encoded as fast lossy WebP.
+
         Args:
             image_paths: List of image file paths
             output_path: Path to save the montage
             cols: Number of columns in montage
+            thumb_size: Maximum (width, height) of each montage cell
 
         Returns:
             True if successful, False otherwise
@@ -201,28 +370,40 @@ class ImageProcessor:
             return False
 
         try:
-            images = []
-            for path in sorted(image_paths):
-                img = Image.open(path)
-                images.append(img)
-
             # Calculate grid dimensions
-            rows = (len(images) + cols - 1) // cols
-            img_width, img_height = images[0].size
+            rows = (len(image_paths) + cols - 1) // cols
+            canvas = None
+
+            # Single pass: each frame is decoded, copied into the canvas and
+            # released before the next one is opened
+            for idx, path in enumerate(sorted(image_paths)):
+                with Image.open(path) as img:
+                    img.thumbnail(thumb_size, Image.Resampling.LANCZOS)
+                    arr = np.asarray(img.convert("RGB"))
+
+                if canvas is None:
+                    # Create montage sized from the first frame; unused cells
+                    # in the last row stay black
+                    img_height, img_width = arr.shape[:2]
+                    montage_width = img_width * cols
+                    montage_height = img_height * rows
+                    canvas = np.zeros((montage_height, montage_width, 3), dtype=np.uint8)
 
-            # Create montage
-            montage_width = img_width * cols
-            montage_height = img_height * rows
-            montage = Image.new("RGB", (montage_width, montage_height))
-
-            for idx, img in enumerate(images):
                 row = idx // cols
                 col = idx % cols
                 x = col * img_width
                 y = row * img_height
-                montage.paste(img, (x, y))
-
-            montage.save(output_path)
+                # Clip to the cell so odd-sized frames behave like Image.paste
+                tile = arr[:img_height, :img_width]
+                canvas[y:y + tile.shape[0], x:x + tile.shape[1]] = tile
+                del arr, tile
+
+            montage = Image.fromarray(canvas)
+            if output_path.suffix.lower() == ".webp":
+                montage.save(output_path, format="WEBP", quality=85, method=0)
+            else:
+                # The montage is only a preview, so favor encode speed over size
+                montage.save(output_path, optimize=False, compress_level=1)
             self._log(f"✓ Created montage: {output_path}")
             return True
 
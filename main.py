@@ -8,8 +8,10 @@ Qwen Image Edit Plus LoRA model.
 """
 
 import argparse
+import asyncio
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
@@ -20,6 +22,8 @@ from config import (
     DEFAULT_GUIDANCE_SCALE,
     DEFAULT_NUM_INFERENCE_STEPS,
     DEFAULT_LORA_SCALE,
+    DOWNLOAD_WORKERS,
+    MONTAGE_FORMAT,
     VERBOSE,
 )
 
@@ -181,6 +185,38 @@ def print_summary(args, image_path, saved_files):
     print("=" * 60 + "\n")
 
 
+async def generate_and_save_views(api_client, image_processor, image_url, output_dir, args):
+    """Generate views and save each one as soon as it is ready, overlapping downloads with generation."""
+    loop = asyncio.get_running_loop()
+    saves = []
+
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+        try:
+            async for result in api_client.stream_views(
+                image_url=image_url,
+                guidance_scale=args.guidance_scale,
+                num_inference_steps=args.num_steps,
+                lora_scale=args.lora_scale,
+                move_forward=args.move_forward,
+                vertical_angle=args.vertical_angle,
+                wide_angle_lens=args.wide_angle,
+            ):
+                save = loop.run_in_executor(
+                    executor,
+                    image_processor.save_generated_image,
+                    result,
+                    output_dir,
+                    "png",
+                )
+                saves.append((result["angle"], save))
+        finally:
+            # Let downloads for views that did succeed finish either way
+            saved = [(angle, await save) for angle, save in saves]
+
+    saved.sort(key=lambda item: item[0])
+    return [path for _, path in saved if path is not None]
+
+
 def main():
     """Main execution function."""
     print_banner()
@@ -197,8 +233,9 @@ def main():
 
     # Initialize components
     try:
-        image_processor = ImageProcessor()
         api_client = APIClient()
+        # Share one connection pool and cache between the API client and image saving
+        image_processor = ImageProcessor(session=api_client.session, cache=api_client.cache)
     except ValueError as e:
         print(f"ERROR: {e}")
         sys.exit(1)
@@ -227,46 +264,31 @@ def main():
         print(f"ERROR: {e}")
         sys.exit(1)
 
-    # Generate multi-angle views
+    # Generate multi-angle views, saving each as it arrives
     try:
         print("Generating multi-angle views...")
         print(f"This will generate 72 images (5° increments) - please be patient...\n")
 
+        output_dir = image_processor.create_output_directory(image_name)
         start_time = datetime.now()
 
-        results = api_client.generate_multi_angle_views(
-            image_url=image_url,
-            guidance_scale=args.guidance_scale,
-            num_inference_steps=args.num_steps,
-            lora_scale=args.lora_scale,
-            move_forward=args.move_forward,
-            vertical_angle=args.vertical_angle,
-            wide_angle_lens=args.wide_angle,
+        saved_files = asyncio.run(
+            generate_and_save_views(api_client, image_processor, image_url, output_dir, args)
         )
 
         elapsed_time = (datetime.now() - start_time).total_seconds()
-        print(f"\n✓ Generation complete in {elapsed_time:.1f} seconds\n")
-
-    except Exception as e:
-        print(f"ERROR during generation: {e}")
-        sys.exit(1)
-
-    # Save generated images
-    try:
-        print("Saving generated images...")
-        output_dir = image_processor.create_output_directory(image_name)
-        saved_files = image_processor.save_generated_images(results, output_dir, "png")
+        print(f"\n✓ Generation complete in {elapsed_time:.1f} seconds")
         print(f"✓ Saved {len(saved_files)} images\n")
 
     except Exception as e:
-        print(f"ERROR while saving images: {e}")
+        print(f"ERROR during generation: {e}")
         sys.exit(1)
 
     # Create montage if requested
     if not args.no_montage and saved_files:
         try:
             print("Creating montage preview...")
-            montage_path = output_dir / f"{image_name}_montage.png"
+            montage_path = output_dir / f"{image_name}_montage.{MONTAGE_FORMAT}"
             if image_processor.create_montage(saved_files, montage_path):
                 print(f"✓ Montage created: {montage_path}\n")
         except Exception as e: